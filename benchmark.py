@@ -1,98 +1,290 @@
 import pandas as pd
 import polars as pl
+import numpy as np
+import os
 import time
 import shutil
 import statistics
 import xlsxwriter
 import gc
 import io
+import functools
 import contextlib
 import duckdb
+from concurrent.futures import ProcessPoolExecutor
+import pyarrow as pa
 import pyarrow.parquet as pq
 import pyarrow.feather as pf
 import pyarrow.csv as pv
 from pathlib import Path
 
+# calamine (Rust) lee .xlsx mucho más rápido que openpyxl; se usa si está instalado
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = 'calamine'
+except ImportError:
+    EXCEL_ENGINE = 'openpyxl'
+
+# numba compila la agregación de muestras; rentable con BUCLES altos
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 # --- Configuración ---
 BUCLES = 5
+# Expulsar cada archivo de la page cache antes de leerlo: mide el decodificador
+# real y no la velocidad de la RAM (requiere posix_fadvise; no-op en Windows)
+COLD_CACHE = True
+# La mitad de los núcleos: paraleliza entre (lib, formato) sin saturar el disco
+MAX_WORKERS = max(1, (os.cpu_count() or 2) // 2)
 DATASETS_DIR = Path('data')
+CACHE_DIR = DATASETS_DIR / '.cache'
 TEMP_DIR = Path('Temp')
 ANALYSIS_FILE = 'results_summary.xlsx'
 
-# Diccionario unificado con funciones lambda
+_DUCKDB_CON = None
+
+def _duckdb_con():
+    """Conexión DuckDB persistente del proceso, con paralelismo configurado."""
+    global _DUCKDB_CON
+    if _DUCKDB_CON is None:
+        _DUCKDB_CON = duckdb.connect()
+        _DUCKDB_CON.execute(f"PRAGMA threads={os.cpu_count()}")
+    return _DUCKDB_CON
+
+# Diccionario unificado de funciones de E/S. Referencias directas (métodos sin
+# ligar o functools.partial) donde la firma lo permite: una frame de Python
+# menos por llamada que con la lambda equivalente
 FORMATOS = {
+    # Las lecturas de texto de pandas usan engine='pyarrow' (códec C++ multihilo)
     'pandas': {
-        'csv': {'write': lambda df, p: df.to_csv(p, index=False), 'read': pd.read_csv},
-        'excel': {'write': lambda df, p: df.to_excel(p, index=False), 'read': pd.read_excel},
-        'parquet': {'write': lambda df, p: df.to_parquet(p, index=False), 'read': pd.read_parquet},
-        'feather': {'write': lambda df, p: df.to_feather(p), 'read': pd.read_feather},
-        'json': {'write': lambda df, p: df.to_json(p, orient='records', lines=True, date_format='iso'), 
-                 'read': lambda p: pd.read_json(p, lines=True)}
+        'csv': {'write': functools.partial(pd.DataFrame.to_csv, index=False),
+                'read': functools.partial(pd.read_csv, engine='pyarrow')},
+        'excel': {'write': functools.partial(pd.DataFrame.to_excel, index=False), 'read': pd.read_excel},
+        'parquet': {'write': functools.partial(pd.DataFrame.to_parquet, index=False), 'read': pd.read_parquet},
+        'feather': {'write': pd.DataFrame.to_feather, 'read': pd.read_feather},
+        'json': {'write': functools.partial(pd.DataFrame.to_json, orient='records', lines=True, date_format='iso'),
+                 'read': functools.partial(pd.read_json, lines=True, engine='pyarrow')}
     },
     'polars': {
-        'csv': {'write': lambda df, p: df.write_csv(p), 'read': pl.read_csv},
-        'excel': {'write': lambda df, p: df.write_excel(p), 'read': pl.read_excel},
-        'parquet': {'write': lambda df, p: df.write_parquet(p), 'read': pl.read_parquet},
-        'feather': {'write': lambda df, p: df.write_ipc(p), 'read': pl.read_ipc},
-        'json': {'write': lambda df, p: df.write_ndjson(p), 'read': pl.read_ndjson}
+        'csv': {'write': pl.DataFrame.write_csv, 'read': pl.read_csv},
+        'excel': {'write': pl.DataFrame.write_excel, 'read': pl.read_excel},
+        'parquet': {'write': pl.DataFrame.write_parquet, 'read': pl.read_parquet},
+        'feather': {'write': pl.DataFrame.write_ipc, 'read': functools.partial(pl.read_ipc, memory_map=True)},
+        'json': {'write': pl.DataFrame.write_ndjson, 'read': pl.read_ndjson},
+        # Eje de compresión: zstd nivel 1 y lz4 priorizan velocidad sobre ratio
+        'parquet_zstd1': {'write': functools.partial(pl.DataFrame.write_parquet, compression='zstd', compression_level=1),
+                          'read': pl.read_parquet},
+        # Sin memory_map: polars no puede mapear IPC comprimido y caería a una
+        # lectura normal avisando por stderr en cada iteración
+        'feather_lz4': {'write': functools.partial(pl.DataFrame.write_ipc, compression='lz4'),
+                        'read': pl.read_ipc}
     },
+    # Las lambdas de duckdb operan sobre la vista Arrow 'df' registrada una
+    # sola vez por dataset en la conexión persistente (escaneo zero-copy)
     'duckdb': {
-        'csv': {'write': lambda df, p: duckdb.query("SELECT * FROM df").write_csv(str(p)), 
-                'read': lambda p: duckdb.query(f"SELECT * FROM read_csv_auto('{p}')").df()},
-        'parquet': {'write': lambda df, p: duckdb.query("SELECT * FROM df").write_parquet(str(p)), 
-                    'read': lambda p: duckdb.query(f"SELECT * FROM read_parquet('{p}')").df()},
-        'json': {'write': lambda df, p: duckdb.execute(f"COPY (SELECT * FROM df) TO '{p}' (FORMAT JSON, ARRAY TRUE)"), 
-                 'read': lambda p: duckdb.query(f"SELECT * FROM read_json_auto('{p}')").df()}
+        'csv': {'write': lambda df, p: _duckdb_con().execute(f"COPY df TO '{p}' (FORMAT CSV, HEADER)"),
+                'read': lambda p: _duckdb_con().execute(f"SELECT * FROM read_csv_auto('{p}')").df()},
+        'parquet': {'write': lambda df, p: _duckdb_con().execute(f"COPY df TO '{p}' (FORMAT PARQUET)"),
+                    'read': lambda p: _duckdb_con().execute(f"SELECT * FROM read_parquet('{p}')").df()},
+        'json': {'write': lambda df, p: _duckdb_con().execute(f"COPY df TO '{p}' (FORMAT JSON, ARRAY TRUE)"),
+                 'read': lambda p: _duckdb_con().execute(f"SELECT * FROM read_json_auto('{p}')").df()}
     },
     'pyarrow': {
-        'csv': {'write': lambda df, p: pv.write_csv(pl.from_pandas(df).to_arrow(), str(p)), 
+        'csv': {'write': pv.write_csv,
                 'read': lambda p: pv.read_csv(str(p)).to_pandas()},
-        'parquet': {'write': lambda df, p: pq.write_table(pl.from_pandas(df).to_arrow(), str(p)), 
-                    'read': lambda p: pq.read_table(str(p)).to_pandas()},
-        'feather': {'write': lambda df, p: pf.write_feather(pl.from_pandas(df).to_arrow(), str(p)), 
-                    'read': lambda p: pf.read_feather(str(p))}
+        'parquet': {'write': pq.write_table,
+                    'read': lambda p: pq.read_table(str(p), memory_map=True).to_pandas()},
+        'feather': {'write': pf.write_feather, 'read': pf.read_feather},
+        # Variante mmap junto a la copiante para hacer explícito el ahorro
+        # zero-copy: sin compresión, o la lectura tendría que descomprimir
+        # cada buffer igualmente
+        'feather_mmap': {'write': functools.partial(pf.write_feather, compression='uncompressed'),
+                         'read': lambda p: pf.read_table(str(p), memory_map=True).to_pandas()},
+        # Eje de compresión: zstd nivel 1 prioriza velocidad sobre ratio
+        'parquet_zstd1': {'write': functools.partial(pq.write_table, compression='zstd', compression_level=1),
+                          'read': lambda p: pq.read_table(str(p), memory_map=True).to_pandas()}
     }
 }
 
-def media_acotada(datos, proporcion_a_quitar=0.1):
-    if not datos: return 0
-    n = len(datos)
+def _escribir_ipc_directo(tabla, p):
+    """Serializa la tabla a un único buffer Arrow IPC y lo vuelca con pwrite+fsync.
+
+    Controlar el buffer completo permite un ciclo write→fsync con syscalls
+    directas, sin pasar por la capa de archivos de pyarrow.
+    """
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, tabla.schema) as writer:
+        writer.write_table(tabla)
+    datos = sink.getvalue()
+
+    fd = os.open(p, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.pwrite(fd, datos, 0)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _leer_ipc_directo(p):
+    """Lee el archivo completo con preadv en un buffer preasignado y lo decodifica."""
+    fd = os.open(p, os.O_RDONLY)
+    try:
+        buf = bytearray(os.fstat(fd).st_size)
+        os.preadv(fd, [buf], 0)
+    finally:
+        os.close(fd)
+    return pa.ipc.open_file(pa.py_buffer(buf)).read_all().to_pandas()
+
+# En plataformas con syscalls posicionales (Linux/macOS), el ciclo Arrow IPC de
+# pyarrow usa el camino directo de buffer único definido arriba
+if hasattr(os, 'preadv'):
+    FORMATOS['pyarrow']['feather'] = {
+        'write': _escribir_ipc_directo,
+        'read': _leer_ipc_directo
+    }
+
+def _media_acotada_np(arr, proporcion_a_quitar):
+    n = arr.size
     quitar = int(n * proporcion_a_quitar)
-    if quitar * 2 >= n: return statistics.median(datos)
-    datos_acotados = sorted(datos)[quitar:-quitar]
-    return (sum(datos_acotados) / len(datos_acotados)) if datos_acotados else statistics.median(datos)
+    if quitar * 2 >= n: return float(np.median(arr))
+    # Partición parcial O(n) en C: no hace falta el orden total de sorted()
+    return float(np.partition(arr, (quitar, n - quitar - 1))[quitar:n - quitar].mean())
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _media_acotada_jit(arr, proporcion_a_quitar):
+        arr = np.sort(arr)
+        n = arr.size
+        quitar = int(n * proporcion_a_quitar)
+        if quitar * 2 >= n:
+            return np.median(arr)
+        return arr[quitar:n - quitar].mean()
+
+def media_acotada(datos, proporcion_a_quitar=0.1):
+    arr = np.asarray(datos, dtype=np.float64)
+    if arr.size == 0: return 0
+    if njit is not None:
+        return float(_media_acotada_jit(arr, proporcion_a_quitar))
+    return _media_acotada_np(arr, proporcion_a_quitar)
+
+def cargar_dataset(archivo):
+    """Garantiza la caché Arrow IPC del dataset y devuelve su ruta.
+
+    Las fuentes .arrow ya están en el formato de la caché y se usan tal cual.
+    Para .xlsx, decodificar Excel es la parte cara; la caché (clave: mtime +
+    tamaño del origen) permite que los workers y las re-ejecuciones hagan un
+    simple mmap del Feather en lugar de volver a parsear XML.
+    """
+    if archivo.suffix == '.arrow':
+        return archivo
+
+    stat = archivo.stat()
+    cache_path = CACHE_DIR / f"{archivo.stem}_{stat.st_mtime_ns}_{stat.st_size}.arrow"
+
+    if cache_path.exists():
+        return cache_path
+
+    pd_df = pd.read_excel(archivo, engine=EXCEL_ENGINE)
+
+    CACHE_DIR.mkdir(exist_ok=True)
+    # Descartar cachés obsoletas del mismo dataset antes de escribir la nueva
+    for viejo in CACHE_DIR.glob(f"{archivo.stem}_*.arrow"):
+        viejo.unlink()
+    # Sin compresión: cada worker mapea la caché tal cual, sin descomprimirla
+    pf.write_feather(pa.Table.from_pandas(pd_df, preserve_index=False), str(cache_path),
+                     compression='uncompressed')
+    return cache_path
+
+def _fsync_archivo(ruta):
+    """Fuerza la escritura durable del archivo en disco."""
+    fd = os.open(ruta, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _soltar_page_cache(ruta):
+    """Expulsa el archivo de la page cache del SO para lecturas en frío."""
+    fd = os.open(ruta, os.O_RDONLY)
+    try:
+        # Las páginas sucias recién escritas no se pueden expulsar: volcarlas antes
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
 
 def medir_tiempos(df, lib_name, fmt, ruta, fmt_name, total_bucles):
-    tiempos = {'lectura': [], 'escritura': []}
+    # Buffers densos preasignados: muestras enteras en ns, sin boxing por iteración
+    t_escritura = np.empty(total_bucles, dtype=np.int64)
+    t_lectura = np.empty(total_bucles, dtype=np.int64)
     size_kb = 0
     buffer_warnings = io.StringIO()
 
+    # Una sola ruta por (lib, formato): sobrescribir el mismo archivo da
+    # extents predecibles y evita acumular BUCLES copias en TEMP_DIR
+    ruta_fmt = ruta.with_stem(f"{ruta.stem}_{lib_name}")
+
+    # GC desactivado durante la región medida: sus pausas no deben contaminar
+    # las muestras; una sola colección al terminar el formato
+    gc.disable()
+
     for i in range(total_bucles):
-        msg = f"  ⚡ {lib_name.upper()} > {fmt_name.upper()}: Iteración {i + 1}/{total_bucles}"
-        print(f"\r{msg}\033[K", end='', flush=True)
-        ruta_iter = ruta.with_stem(f"{ruta.stem}_{lib_name}_{i}")
-        
         try:
             with contextlib.redirect_stderr(buffer_warnings):
-                start = time.perf_counter()
-                fmt['write'](df, ruta_iter)
-                tiempos['escritura'].append((time.perf_counter() - start) * 1000)
-                
-                if i == 0: size_kb = ruta_iter.stat().st_size / 1024
-                
-                start = time.perf_counter()
-                fmt['read'](ruta_iter)
-                tiempos['lectura'].append((time.perf_counter() - start) * 1000)
-            
-            gc.collect() 
+                start = time.perf_counter_ns()
+                fmt['write'](df, ruta_fmt)
+                # fsync dentro de la ventana: se mide la escritura durable.
+                # Solo POSIX: en Windows fsync sobre un fd de lectura falla,
+                # así que allí los tiempos no incluyen durabilidad
+                if os.name == 'posix':
+                    _fsync_archivo(ruta_fmt)
+                t_escritura[i] = time.perf_counter_ns() - start
+
+                if i == 0: size_kb = ruta_fmt.stat().st_size / 1024
+
+                if COLD_CACHE and hasattr(os, 'posix_fadvise'):
+                    _soltar_page_cache(ruta_fmt)
+
+                start = time.perf_counter_ns()
+                fmt['read'](ruta_fmt)
+                t_lectura[i] = time.perf_counter_ns() - start
         except Exception as e:
             print(f"\n❌ Error en {lib_name}/{fmt_name}: {e}")
-            tiempos['escritura'].append(0); tiempos['lectura'].append(0)
+            t_escritura[i] = 0; t_lectura[i] = 0
+
+    gc.enable()
+    gc.collect()
+
+    # Borrado inmediato: el archivo ya no se necesita entre formatos
+    ruta_fmt.unlink(missing_ok=True)
 
     warn_text = buffer_warnings.getvalue().strip()
     suffix = f" [Aviso: {warn_text.splitlines()[0]}]" if warn_text else ""
-    print(f"\r  ✅ {lib_name.upper()} > {fmt_name.upper()}: Completado.{suffix}\033[K")
-    return tiempos, size_kb
+    # Conversión ns→ms una sola vez, fuera de la región medida
+    return {'lectura': t_lectura * 1e-6, 'escritura': t_escritura * 1e-6}, size_kb, suffix
+
+def _benchmark_tarea(cache_path, lib, fmt_name, ruta, total_bucles):
+    """Tarea de un worker: carga el dataset vía mmap y mide un (lib, formato).
+
+    Cada worker reconstruye su representación nativa una sola vez; las
+    iteraciones de escritura/lectura se ejecutan en serie dentro del worker
+    para que los tiempos por formato sigan siendo comparables.
+    """
+    tabla = pf.read_table(str(cache_path), memory_map=True)
+    if lib == 'pyarrow' or lib == 'duckdb':
+        if lib == 'duckdb':
+            _duckdb_con().register('df', tabla)
+        df = tabla
+    elif lib == 'polars':
+        df = pl.from_arrow(tabla)
+    else:
+        df = tabla.to_pandas()
+
+    # El dataset vive durante todo el worker: congelarlo evita que cada
+    # colección recorra sus millones de objetos
+    gc.freeze()
+    return medir_tiempos(df, lib, FORMATOS[lib][fmt_name], ruta, fmt_name, total_bucles)
 
 def _formatear_resumen(writer, df_pivot):
     # Ordenar y reindexar métricas
@@ -124,20 +316,19 @@ def _formatear_resumen(writer, df_pivot):
     libs = df_pivot.columns.levels[1]
     num_libs = len(libs)
 
+    # Anchos precomputados en una sola pasada vectorizada sobre el pivot
+    anchos_datos = df_pivot.map(lambda x: len(f"{x:,.2f}") if pd.notna(x) else 0).max()
+
     col_actual = 2
     for metric in metricas_presentes:
         style = style_esc if 'Esc' in metric else style_lec if 'Lec' in metric else style_tam
         worksheet.merge_range(0, col_actual, 0, col_actual + num_libs - 1, metric, style)
-        
+        worksheet.write_row(1, col_actual, [lib.upper() for lib in libs], style_lib)
+
         for i, lib in enumerate(libs):
-            worksheet.write(1, col_actual + i, lib.upper(), style_lib)
-            
-            # Ancho dinámico basado en contenido y cabeceras inferiores
-            col_data = df_pivot[(metric, lib)]
-            data_max = col_data.apply(lambda x: len(f"{x:,.2f}") if pd.notna(x) else 0).max()
-            actual_width = max(len(lib), data_max) + 4
+            actual_width = max(len(lib), anchos_datos[(metric, lib)]) + 4
             worksheet.set_column(col_actual + i, col_actual + i, actual_width)
-        
+
         col_actual += num_libs
 
     # Anchos para las columnas de índice
@@ -147,15 +338,11 @@ def _formatear_resumen(writer, df_pivot):
         worksheet.set_column(i, i, actual_width)
 
     # --- Escritura de Datos ---
+    # write_row procesa la fila completa en un solo cruce Python→C
     for row_idx, (idx_tuple, row_data) in enumerate(df_pivot.iterrows(), start=2):
-        worksheet.write(row_idx, 0, idx_tuple[0], idx_data_fmt)
-        worksheet.write(row_idx, 1, idx_tuple[1], idx_data_fmt)
-        
-        for col_idx, val in enumerate(row_data, start=2):
-            if pd.notna(val):
-                worksheet.write(row_idx, col_idx, val, num_fmt)
-            else:
-                worksheet.write_blank(row_idx, col_idx, '', num_fmt)
+        worksheet.write_row(row_idx, 0, idx_tuple, idx_data_fmt)
+        worksheet.write_row(row_idx, 2,
+                            [v if pd.notna(v) else None for v in row_data.tolist()], num_fmt)
 
     # --- Formato Condicional y Congelado ---
     worksheet.freeze_panes(2, 2)
@@ -173,7 +360,8 @@ def _formatear_resumen(writer, df_pivot):
         
 def analizar_archivos():
     """Ejecuta el benchmark y genera el reporte Excel jerárquico."""
-    archivos = sorted(list(DATASETS_DIR.glob('*.xlsx')), key=lambda p: p.stat().st_size)
+    archivos = sorted([*DATASETS_DIR.glob('*.xlsx'), *DATASETS_DIR.glob('*.arrow')],
+                      key=lambda p: p.stat().st_size)
     if not archivos:
         print(f"⚠️  No se encontraron archivos en '{DATASETS_DIR}'.")
         return
@@ -181,38 +369,43 @@ def analizar_archivos():
     shutil.rmtree(TEMP_DIR, ignore_errors=True)
     TEMP_DIR.mkdir(exist_ok=True)
     
-    resultados = []
+    # Buffer columnar (SoA): una lista por métrica en vez de un dict por fila
+    resultados = {
+        "Librería": [], "Archivo": [], "Formato": [],
+        "Tamaño (KB)": [], "Lectura (ms)": [], "Escritura (ms)": []
+    }
     metric_func = media_acotada if BUCLES >= 5 else statistics.mean
 
+    # Preparar la lista plana de tareas (archivo, lib, formato)
+    tareas = []
     for archivo in archivos:
         size_mb = archivo.stat().st_size / (1024**2)
-        print(f"\n📂 DATASET: {archivo.stem.upper()} ({size_mb:.2f} MB)")
-        
-        pd_df = pd.read_excel(archivo, engine='openpyxl')
-        
-        dfs = {
-            'pandas': pd_df,
-            'polars': pl.from_pandas(pd_df),
-            'duckdb': pd_df,
-            'pyarrow': pd_df
-        }
-        
+        print(f"📂 DATASET: {archivo.stem.upper()} ({size_mb:.2f} MB)")
+
+        cache_path = cargar_dataset(archivo)
+
         for lib in FORMATOS.keys():
-            df_actual = dfs[lib]
-            for fmt_name, fmt_details in FORMATOS[lib].items():
-                ext = {'excel': 'xlsx', 'feather': 'arrow'}.get(fmt_name, fmt_name)
-                ruta = TEMP_DIR / f"{archivo.stem}.{ext}"
-                
-                tiempos, size_kb = medir_tiempos(df_actual, lib, fmt_details, ruta, fmt_name, BUCLES)
-                
-                resultados.append({
-                    "Librería": lib.upper(), 
-                    "Archivo": archivo.stem, 
-                    "Formato": fmt_name.upper(),
-                    "Tamaño (KB)": size_kb, 
-                    "Lectura (ms)": metric_func(tiempos['lectura']),
-                    "Escritura (ms)": metric_func(tiempos['escritura'])
-                })
+            for fmt_name in FORMATOS[lib].keys():
+                ext = {'excel': 'xlsx', 'feather': 'arrow', 'feather_mmap': 'arrow',
+                       'feather_lz4': 'arrow', 'parquet_zstd1': 'parquet'}.get(fmt_name, fmt_name)
+                ruta = TEMP_DIR / f"{archivo.stem}_{fmt_name}.{ext}"
+                tareas.append((archivo.stem, cache_path, lib, fmt_name, ruta))
+
+    print(f"\n🚀 Ejecutando {len(tareas)} benchmarks en {MAX_WORKERS} procesos...")
+    with ProcessPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        futuros = [pool.submit(_benchmark_tarea, cache_path, lib, fmt_name, ruta, BUCLES)
+                   for _, cache_path, lib, fmt_name, ruta in tareas]
+
+        for (stem, _, lib, fmt_name, _), futuro in zip(tareas, futuros):
+            tiempos, size_kb, aviso = futuro.result()
+            print(f"  ✅ {lib.upper()} > {fmt_name.upper()} ({stem}): Completado.{aviso}")
+
+            resultados["Librería"].append(lib.upper())
+            resultados["Archivo"].append(stem)
+            resultados["Formato"].append(fmt_name.upper())
+            resultados["Tamaño (KB)"].append(size_kb)
+            resultados["Lectura (ms)"].append(metric_func(tiempos['lectura']))
+            resultados["Escritura (ms)"].append(metric_func(tiempos['escritura']))
 
     df_resum = pd.DataFrame(resultados)
     
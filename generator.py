@@ -1,20 +1,37 @@
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.feather as pf
 from pathlib import Path
 import lorem
-from datetime import datetime, timedelta
 
 # --- Configuración de Reproducibilidad ---
 # Fijar la semilla asegura que el benchmark sea comparable siempre
-np.random.seed(42) 
+np.random.seed(42)
+
+# 'feather' evita por completo el coste de serializar .xlsx, pero conserva
+# dtypes (duration, null) que los escritores de texto de algunas librerías no
+# aceptan; 'excel' es el valor seguro y ejercita el flujo BYOD estándar
+FORMATO_FUENTE = 'excel'
+
+# Vocabulario fijo de lorem: el muestreo por fila es NumPy puro, sin llamar
+# a lorem.sentence() una vez por registro
+PALABRAS = np.array(lorem.text().split())
+
+def _frases(n, min_palabras, max_palabras):
+    """Genera n frases muestreando palabras del vocabulario de forma vectorizada."""
+    longitudes = np.random.randint(min_palabras, max_palabras, size=n)
+    palabras = PALABRAS[np.random.randint(0, PALABRAS.size, size=longitudes.sum())]
+    cortes = np.cumsum(longitudes)[:-1]
+    return [' '.join(trozo).capitalize() + '.' for trozo in np.split(palabras, cortes)]
 
 TIPOS = {
     'num': ('Precio', lambda n: np.random.rand(n) * 100),
     'int': ('Cantidad', lambda n: np.random.randint(0, 1000, size=n)),
-    'text': ('Descripción', lambda n: [lorem.sentence() for _ in range(n)]),
-    'long_text': ('Notas', lambda n: [lorem.paragraph() for _ in range(n)]),
-    'date': ('Fecha', lambda n: [datetime(2023,1,1) + timedelta(days=int(x)) for x in np.random.randint(0, 365, size=n)]),
-    'time': ('Hora', lambda n: [str(timedelta(seconds=int(x))) for x in np.random.randint(0, 24*3600, size=n)]),
+    'text': ('Descripción', lambda n: _frases(n, 6, 14)),
+    'long_text': ('Notas', lambda n: _frases(n, 40, 80)),
+    'date': ('Fecha', lambda n: pd.Series(np.datetime64('2023-01-01') + np.random.randint(0, 365, size=n).astype('timedelta64[D]'))),
+    'time': ('Hora', lambda n: pd.Series(np.random.randint(0, 24 * 3600, size=n).astype('timedelta64[s]'))),
     'bool': ('Disponible', lambda n: np.random.choice([True, False], size=n)),
     'category': ('Categoría', lambda n: pd.Categorical(np.random.choice(['cat1', 'cat2', 'cat3'], size=n))),
     'null': ('Sin_datos', lambda n: [None] * n),
@@ -32,15 +49,27 @@ def crear_datos(filas, columnas, tipos):
     return pd.DataFrame(data)
 
 def guardar_excel(dfs, carpeta="data"):
-    """Crea el directorio si no existe y guarda los DataFrames."""
+    """Crea el directorio si no existe y guarda los DataFrames como .xlsx."""
     output_dir = Path(carpeta)
     output_dir.mkdir(parents=True, exist_ok=True)
-    
+
     for nombre, df in dfs.items():
         archivo = output_dir / f"{nombre}.xlsx"
+        # Sin constant_memory: pandas emite las celdas por columnas y ese modo
+        # descarta en silencio las escrituras a filas ya volcadas
         df.to_excel(archivo, index=False, engine='xlsxwriter')
         print(f"✅ Archivo generado: {archivo} | Filas: {len(df)}")
 
+def guardar_feather(dfs, carpeta="data"):
+    """Persiste los DataFrames como Arrow IPC comprimido, listos para el benchmark."""
+    output_dir = Path(carpeta)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    for nombre, df in dfs.items():
+        archivo = output_dir / f"{nombre}.arrow"
+        pf.write_feather(pa.Table.from_pandas(df, preserve_index=False), str(archivo), compression='zstd')
+        print(f"✅ Archivo generado: {archivo} | Filas: {len(df)}")
+
 def main():
     config_tamaños = {
         'pequeño': (1_000, 12),
@@ -59,7 +88,8 @@ def main():
     }
     
     print("💾 Persistiendo datos en disco...")
-    guardar_excel(datasets)
+    guardar = guardar_feather if FORMATO_FUENTE == 'feather' else guardar_excel
+    guardar(datasets)
     print("\n✨ Proceso finalizado. Todo listo para el benchmark.")
 
 if __name__ == "__main__":